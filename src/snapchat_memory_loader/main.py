@@ -1,14 +1,54 @@
+import io
+import atexit
 import os
 import re
+import sys
 import time
+import asyncio
 import subprocess
-import requests
+import aiohttp
+import aiofiles
 import json
+import multiprocessing
+import random
 import zipfile
 import shutil
-from bs4 import BeautifulSoup
+import struct
+import threading
+import lxml.html
+from lxml import etree
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
+from urllib.parse import urlsplit
+
+# --- OPTIONAL FAST DECOMPRESSION ---
+# zlib-ng's SIMD inflate and CRC32 speed up ZIP extraction (pip install zlib-ng)
+try:
+    from zlib_ng import zlib_ng
+    zipfile.zlib = zlib_ng
+    zipfile.crc32 = zlib_ng.crc32
+except ImportError:
+    pass
+
+# --- PLATFORM ---
+# Creation times can only be set on Windows; bind the Win32 calls once at import
+IS_WIN = sys.platform.startswith("win")
+if IS_WIN:
+    import ctypes
+    from ctypes import wintypes
+
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    kernel32.CreateFileW.restype = wintypes.HANDLE
+    kernel32.CreateFileW.argtypes = [wintypes.LPCWSTR, wintypes.DWORD, wintypes.DWORD, wintypes.LPVOID,
+                                     wintypes.DWORD, wintypes.DWORD, wintypes.HANDLE]
+    kernel32.SetFileTime.argtypes = [wintypes.HANDLE, ctypes.POINTER(wintypes.FILETIME),
+                                     ctypes.POINTER(wintypes.FILETIME), ctypes.POINTER(wintypes.FILETIME)]
+    kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+    FILE_WRITE_ATTRIBUTES, FILE_SHARE_ALL, OPEN_EXISTING = 0x100, 0x7, 3
+    FILE_FLAG_BACKUP_SEMANTICS = 0x02000000  # Required to open folders
+    INVALID_HANDLE_VALUE = wintypes.HANDLE(-1).value
 
 # --- DYNAMIC PATH RESOLUTION ---
 ROOT_DIR = Path(__file__).parent.parent.parent
@@ -26,18 +66,45 @@ except Exception as e:
 HTML_FILE = config["input_html"]
 DOWNLOAD_FOLDER = config["download_folder"]
 ET_CMD = config["exiftool"]  # Can be a path or just "exiftool"
+ET_ABS = shutil.which(ET_CMD) or ET_CMD  # Resolved against PATH once, not per call
 LOG_FILE = ROOT_DIR / "failed_downloads.log"
 SUMMARY_FILE = ROOT_DIR / "download_summary.txt"
 
+# --- DOWNLOAD TUNING ---
+MAX_CONCURRENT_DOWNLOADS = 16   # Downloads in flight at the same time
+MAX_CONNECTIONS = 32            # Size of the shared keep-alive connection pool
+MAX_CONNECTIONS_PER_HOST = 8    # Open connections per Snapchat host
+KEEPALIVE_TIMEOUT = 60          # Seconds an idle connection stays open for reuse
+CHUNK_SIZE = 1 << 20            # Bytes read per streamed chunk (1 MiB)
+COPY_BUFFER = CHUNK_SIZE        # Buffer size for copying ZIP members to disk
+MAX_RETRIES = 3                 # Attempts per file before giving up
+MAX_BACKOFF = 60                # Upper bound (seconds) for a single retry delay
+
+ZIP_MAGIC = b"PK\x03\x04"        # Local file header signature of a ZIP archive
+
+# --- PRECOMPILED PATTERNS ---
+DM_RE = re.compile(r"downloadMemories\('([^']+)'")
+DATE_RE = re.compile(r"(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})")
+DATE_TABLE = str.maketrans({":": "-", " ": "_"})  # "2025-11-14 11:38:59 UTC" -> "2025-11-14_11-38-59_UTC"
+ROWS_XPATH = etree.XPath("//tr")
+CELLS_XPATH = etree.XPath("./td")
+ONCLICK_XPATH = etree.XPath("(.//a)[1]/@onclick")
+
+# Buffered handle for LOG_FILE, opened on the first failure
+_log_fh = None
+
+# Per-host request pacing: host -> TokenBucket
+RATE_LIMITS = {}
+
 def check_environment():
     """Checks if required tools (ExifTool) and folders are available."""
     print("🔍 Pre-flight check...")
     
     # 1. Check ExifTool (works with absolute path or PATH variable)
-    exiftool_path = shutil.which(ET_CMD)
+    exiftool_path = ET_ABS if os.path.isfile(ET_ABS) else None  # Reuses the import-time lookup
     if exiftool_path:
         try:
-            result = subprocess.run([ET_CMD, "-ver"], capture_output=True, text=True, check=True)
+            result = subprocess.run([ET_ABS, "-ver"], capture_output=True, text=True, check=True)
             print(f"   ✅ ExifTool: Ready (Version: {result.stdout.strip()})")
         except Exception as e:
             print(f"   ❌ ERROR: ExifTool found at '{exiftool_path}' but not executable: {e}")
@@ -52,11 +119,16 @@ def check_environment():
             print(f"   📂 Creating download folder: {DOWNLOAD_FOLDER}")
             os.makedirs(DOWNLOAD_FOLDER)
         
-        # Test write permissions
-        test_file = os.path.join(DOWNLOAD_FOLDER, ".write_test")
-        with open(test_file, "w") as f:
-            f.write("test")
-        os.remove(test_file)
+        # Test write permissions: a cheap access check every run, a real write only once
+        if not os.access(DOWNLOAD_FOLDER, os.W_OK):
+            raise PermissionError(f"No write permission for '{DOWNLOAD_FOLDER}'")
+        sentinel = Path(DOWNLOAD_FOLDER) / ".snapchat_loader_ok"
+        if not sentinel.exists():
+            test_file = os.path.join(DOWNLOAD_FOLDER, ".write_test")
+            with open(test_file, "w") as f:
+                f.write("test")
+            os.remove(test_file)
+            sentinel.touch()
         print("   ✅ Download Folder: Ready and writable")
     except Exception as e:
         print(f"   ❌ ERROR: Cannot access or write to download folder: {e}")
@@ -64,80 +136,211 @@ def check_environment():
 
     return True
 
-def is_zip_file(filepath):
-    """Checks if a file is actually a ZIP archive regardless of extension."""
-    return zipfile.is_zipfile(filepath)
+class ExifTool:
+    """Keeps a single ExifTool process alive (-stay_open) and feeds it one command at a time."""
+
+    def __init__(self, executable):
+        self.process = subprocess.Popen([executable, "-stay_open", "True", "-@", "-"],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.DEVNULL)
+        self.lock = threading.Lock()  # Metadata is synced from several worker threads
+
+    def execute(self, *args):
+        """Runs one ExifTool command and returns its output once '{ready}' is seen."""
+        payload = "\n".join(("-charset", "filename=utf8") + args + ("-execute",)) + "\n"
+        with self.lock:
+            self.process.stdin.write(payload.encode("utf-8"))
+            self.process.stdin.flush()
+            output = []
+            while True:
+                line = self.process.stdout.readline()
+                if not line:
+                    raise RuntimeError("ExifTool exited unexpectedly")
+                if line.strip() == b"{ready}":
+                    return b"".join(output)
+                output.append(line)
 
-def set_metadata_from_filename(target_path, is_directory=False):
-    """Uses ExifTool to sync timestamps."""
+    def close(self):
+        """Asks ExifTool to leave -stay_open mode and waits for it to exit."""
+        try:
+            self.process.stdin.write(b"-stay_open\nFalse\n")
+            self.process.stdin.close()
+        except OSError:
+            pass
+        self.process.wait()
+
+def set_creation_time(path, timestamp):
+    """Sets the creation time of a file or folder via SetFileTime (Windows only)."""
+    if not IS_WIN: return
+    # FILETIME counts 100 ns intervals since 1601-01-01
+    intervals = int(timestamp * 10_000_000) + 116444736000000000
+    filetime = wintypes.FILETIME(intervals & 0xFFFFFFFF, intervals >> 32)
+
+    handle = kernel32.CreateFileW(path, FILE_WRITE_ATTRIBUTES, FILE_SHARE_ALL, None,
+                                  OPEN_EXISTING, FILE_FLAG_BACKUP_SEMANTICS, None)
+    if handle == INVALID_HANDLE_VALUE:
+        raise ctypes.WinError(ctypes.get_last_error())
+    try:
+        if not kernel32.SetFileTime(handle, ctypes.byref(filetime), None, None):
+            raise ctypes.WinError(ctypes.get_last_error())
+    finally:
+        kernel32.CloseHandle(handle)
+
+def set_metadata_from_filename(target_path, exiftool, is_directory=False):
+    """Uses ExifTool and file system timestamps to sync the capture date."""
     try:
         # 1. Extract date from the name
         basename = os.path.basename(target_path)
-        match = re.search(r"(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})", basename)
+        match = DATE_RE.search(basename)
         if not match: return False
             
         date_str = match.group(1) # Format: 2025-11-14_11-38-59
-        # Conversion for PowerShell: 11/14/2025 11:38:59
         dt_obj = datetime.strptime(date_str, "%Y-%m-%d_%H-%M-%S")
-        ps_date = dt_obj.strftime("%m/%d/%Y %H:%M:%S")
+        ts = dt_obj.timestamp()  # Interpreted as local time, like ExifTool does
 
         # 2. ExifTool attempt (for internal metadata in JPG/MP4)
-        et_args = [ET_CMD, "-AllDates<filename", "-FileModifyDate<filename", 
-                   "-overwrite_original", "-q", "-q", target_path]
-        subprocess.run(et_args, stderr=subprocess.DEVNULL)
+        exiftool.execute("-AllDates<filename", "-FileModifyDate<filename",
+                         "-overwrite_original", "-q", "-q", target_path)
 
-        # 3. PowerShell Fix (Forces creation and modification date under Windows)
+        # 3. File system timestamps (modification everywhere, creation under Windows)
         # Works for files AND folders, regardless of whether the format is 'valid'
+        paths = []
         if is_directory:
-            # Sets date for the folder and all files in it
-            ps_cmd = (
-                f'$d = "{ps_date}"; '
-                f'Get-Item "{target_path}" | % {{ $_.CreationTime = $d; $_.LastWriteTime = $d }}; '
-                f'Get-ChildItem "{target_path}" -Recurse | % {{ $_.CreationTime = $d; $_.LastWriteTime = $d }}'
-            )
-        else:
-            ps_cmd = (
-                f'$d = "{ps_date}"; '
-                f'Get-Item "{target_path}" | % {{ $_.CreationTime = $d; $_.LastWriteTime = $d }}'
-            )
-        
-        subprocess.run(["powershell", "-Command", ps_cmd], capture_output=True)
+            # Sets date for all files and subfolders, bottom-up so every folder is stamped after its content
+            for root, dirs, files in os.walk(target_path, topdown=False):
+                paths.extend(os.path.join(root, name) for name in files + dirs)
+        paths.append(target_path)
+        for path in paths:
+            os.utime(path, (ts, ts))
+            set_creation_time(path, ts)
 
         return True
     except Exception as e:
         print(f"   ⚠️ Metadata error on {basename}: {e}")
         return False
 
-def extract_sync_and_cleanup_zip(filepath, target_dir):
-    """Extracts ZIP, syncs metadata, and deletes the ZIP file afterward."""
+def stored_member_view(view, info):
+    """Returns a zero-copy view on the raw bytes of a stored (uncompressed) ZIP member."""
+    offset = info.header_offset
+    if view[offset:offset + 4] != ZIP_MAGIC:
+        raise zipfile.BadZipFile(f"Bad local header for {info.filename}")
+    # The local header's name/extra lengths may differ from the central directory's
+    name_len, extra_len = struct.unpack_from("<HH", view, offset + 26)
+    start = offset + 30 + name_len + extra_len
+    if start + info.file_size > len(view):
+        raise zipfile.BadZipFile(f"Truncated member {info.filename}")
+    return view[start:start + info.file_size]
+
+def extract_zip(data, extraction_path):
+    """Extracts ZIP bytes member by member into their folder (runs in a worker process)."""
+    # Build the folder under a .part name and move it into place when complete, so a failure
+    # never leaves (or deletes) anything at extraction_path itself
+    part_path = f"{extraction_path}.part"
     try:
-        folder_name = os.path.splitext(os.path.basename(filepath))[0]
-        extraction_path = os.path.join(target_dir, folder_name)
-        if not os.path.exists(extraction_path): 
-            os.makedirs(extraction_path)
-        
-        with zipfile.ZipFile(filepath, 'r') as zip_ref:
-            zip_ref.extractall(extraction_path)
-        
-        set_metadata_from_filename(extraction_path, is_directory=True)
-        os.remove(filepath)
-        print(f"   📦 Extracted, synced and deleted ZIP.")
+        shutil.rmtree(part_path, ignore_errors=True)  # Leftover of an interrupted run
+        os.makedirs(part_path)
+        root = os.path.realpath(part_path)
+        # BytesIO(data) shares the bytes until written to; getbuffer() would copy the whole archive
+        with zipfile.ZipFile(io.BytesIO(data)) as zip_ref, memoryview(data) as view:
+            for info in zip_ref.infolist():
+                target = os.path.realpath(os.path.join(root, info.filename))
+                if not target.startswith(root + os.sep): continue  # Skip path traversal entries
+                if info.is_dir():
+                    os.makedirs(target, exist_ok=True)
+                    continue
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(target, 'wb') as dst:
+                    if info.compress_type == zipfile.ZIP_STORED and not info.flag_bits & 0x1:
+                        # Nothing to inflate: write straight from the download buffer
+                        dst.write(stored_member_view(view, info))
+                    else:
+                        with zip_ref.open(info) as src:
+                            shutil.copyfileobj(src, dst, length=COPY_BUFFER)
+        os.replace(part_path, extraction_path)  # Fails rather than merging into an existing folder
         return True
     except Exception:
+        shutil.rmtree(part_path, ignore_errors=True)
         return False
 
+def retry_delay(headers, attempt):
+    """Returns the seconds to wait before the next attempt (Retry-After aware, with jitter)."""
+    retry_after = headers.get("Retry-After", "").strip()
+    base = int(retry_after) if retry_after.isdigit() else 2 ** attempt
+    return min(base, MAX_BACKOFF) + random.uniform(0, 1)
+
+class TokenBucket:
+    """Paces requests to one host by the X-RateLimit-* window it reports (no delay until it does)."""
+
+    def __init__(self):
+        self.tokens = None  # Unknown until the server reports a limit
+        self.reset_at = 0.0
+        self.paused_until = 0.0
+
+    def update(self, headers):
+        """Refills the bucket from the rate-limit headers of a response."""
+        remaining = headers.get("X-RateLimit-Remaining", "").strip()
+        if not remaining.isdigit():
+            return
+        reset = headers.get("X-RateLimit-Reset", "").strip()
+        reset_in = int(reset) if reset.isdigit() else 1
+        if reset_in > time.time():  # Some servers send an epoch timestamp instead of seconds
+            reset_in -= int(time.time())
+        now = time.monotonic()
+        self.reset_at = max(self.reset_at, now + max(reset_in, 0))
+        if now < self.paused_until:
+            return  # A response already in flight must not end a 429/503 back-off early
+        self.tokens = int(remaining)
+
+    def pause(self, delay):
+        """Empties the bucket so every request to this host waits (e.g. after HTTP 429/503)."""
+        self.tokens = 0
+        self.paused_until = max(self.paused_until, time.monotonic() + delay)
+        self.reset_at = max(self.reset_at, self.paused_until)
+
+    async def acquire(self):
+        """Takes one token, waiting for the window to reset if the bucket is empty."""
+        if self.tokens is None:
+            return
+        if self.tokens > 0:
+            self.tokens -= 1
+            return
+        wait = self.reset_at - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(min(wait, MAX_BACKOFF))
+        self.tokens = None  # New window: the next response reports its size
+
 def log_failure(filename, url, reason):
     """Logs the failure to file and prints a message to console."""
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     log_entry = f"[{timestamp}] FAILED: {filename} | {reason} | URL: {url}\n"
     
-    with open(LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(log_entry)
+    global _log_fh
+    if _log_fh is None:
+        # Opened once on the first failure, buffered, and flushed when the program exits
+        _log_fh = open(LOG_FILE, "a", buffering=1 << 16, encoding="utf-8")
+        atexit.register(_log_fh.close)
+    _log_fh.write(log_entry)
     
     print(f"\n   ❌ !!! DOWNLOAD FAILED !!!")
     print(f"   Filename: {filename} | Reason: {reason}\n")
 
-def download_memories():
+def parse_rows(rows):
+    """Extracts (date_clean, ext, url) for every table row that carries a download link."""
+    memories = []
+    for row in rows:
+        cols = CELLS_XPATH(row)
+        if len(cols) < 4: continue
+
+        onclick = ONCLICK_XPATH(cols[3])
+        match = DM_RE.search(onclick[0]) if onclick else None
+        if not match: continue
+
+        date_clean = cols[0].text_content().strip().translate(DATE_TABLE).removesuffix("_UTC")
+        ext = ".mp4" if "video" in cols[1].text_content().lower() else ".jpg"
+        memories.append((date_clean, ext, match.group(1)))
+    return memories
+
+async def download_memories():
     if not check_environment():
         print("🛑 Aborting due to environment issues.")
         return
@@ -152,84 +355,148 @@ def download_memories():
         print(f"❌ ERROR: HTML file not found at {html_path}")
         return
 
-    with open(html_path, 'r', encoding='utf-8') as f:
-        soup = BeautifulSoup(f, 'html.parser')
+    tree = lxml.html.parse(str(html_path), parser=lxml.html.HTMLParser(encoding='utf-8'))
+    memories = parse_rows(ROWS_XPATH(tree)[1:])
+    total = len(memories)
+    sem = asyncio.Semaphore(MAX_CONCURRENT_DOWNLOADS)
+    # One directory listing instead of two stat calls per row
+    with os.scandir(DOWNLOAD_FOLDER) as entries:
+        existing = {entry.name for entry in entries}
 
-    rows = soup.find_all('tr')[1:] 
-    total = len(rows)
-    session = requests.Session()
-    session.headers.update({"User-Agent": "Mozilla/5.0...", "X-Snap-Route-Tag": "mem-dmd"})
-    start_time = time.time()
+    # Skip what is already on disk (and same-second duplicates) before any I/O starts
+    pending, claimed = [], set()
+    for i, (date_clean, ext, download_url) in enumerate(memories):
+        filename = f"{date_clean}{ext}"
+        if filename in existing or date_clean in existing or filename in claimed: continue
+        claimed.add(filename)
+        pending.append((i, date_clean, ext, download_url))
+    stats["skipped"] = total - len(pending)
+    # Rows sharing a timestamp share the ZIP folder name: run those one after another
+    folder_locks = defaultdict(asyncio.Lock)
+    start_time = time.monotonic()
+    eta_str, last_eta_ts = "Calculating...", 0.0
 
-    for i, row in enumerate(rows):
-        cols = row.find_all('td')
-        if len(cols) < 4: continue
+    async def download_one(session, i, date_clean, ext, download_url):
+        nonlocal eta_str, last_eta_ts
+        filename = f"{date_clean}{ext}"
+        filepath = os.path.join(DOWNLOAD_FOLDER, filename)
+        extracted_folder = os.path.join(DOWNLOAD_FOLDER, date_clean)
+        bucket = RATE_LIMITS.setdefault(urlsplit(download_url).hostname, TokenBucket())
 
-        date_clean = cols[0].text.strip().replace(":", "-").replace(" ", "_").replace("_UTC", "")
-        media_type_html = cols[1].text.strip().lower()
-        link_tag = cols[3].find('a')
-
-        if link_tag and 'onclick' in link_tag.attrs:
-            match = re.search(r"downloadMemories\('(.+?)'", link_tag['onclick'])
-            if match:
-                download_url = match.group(1)
-                
-                ext = ".mp4" if "video" in media_type_html else ".jpg"
-                filename = f"{date_clean}{ext}"
-                filepath = os.path.join(DOWNLOAD_FOLDER, filename)
-                zip_filepath = os.path.join(DOWNLOAD_FOLDER, f"{date_clean}.zip")
-                extracted_folder = os.path.join(DOWNLOAD_FOLDER, date_clean)
-
-                if os.path.exists(filepath) or os.path.exists(extracted_folder):
-                    stats["skipped"] += 1
-                    continue
+        async with folder_locks[date_clean], sem:
+            # An earlier row with this timestamp may have extracted its ZIP meanwhile
+            if date_clean in existing:
+                stats["skipped"] += 1
+                return
+
+            # Refresh the ETA at most once per second instead of formatting it for every file
+            now = time.monotonic()
+            done = stats["jpg"] + stats["mp4"] + stats["zip"] + stats["errors"]
+            if done > 0 and now - last_eta_ts > 1.0:
+                avg = (now - start_time) / done
+                eta_str = str(timedelta(seconds=int((len(pending) - done) * avg)))
+                last_eta_ts = now
+            
+            print(f"[{i+1}/{total}] (ETA: {eta_str}) Processing: {filename}")
 
-                elapsed = time.time() - start_time
-                avg = elapsed / (stats["jpg"] + stats["mp4"] + stats["zip"] + stats["errors"] + 1)
-                eta = str(timedelta(seconds=int((total - (i + 1)) * avg))) if i > 0 else "Calculating..."
-                
-                print(f"[{i+1}/{total}] (ETA: {eta}) Processing: {filename}")
-
-                success, retries, last_err = False, 3, "Unknown"
-                while not success and retries > 0:
-                    try:
-                        resp = session.get(download_url, stream=True, timeout=30)
-                        if resp.status_code == 200:
-                            with open(filepath, 'wb') as f:
-                                for chunk in resp.iter_content(chunk_size=8192): f.write(chunk)
-                            
-                            if is_zip_file(filepath):
-                                os.rename(filepath, zip_filepath)
-                                if extract_sync_and_cleanup_zip(zip_filepath, DOWNLOAD_FOLDER):
-                                    stats["zip"] += 1
-                                    success = True
+            success, attempt, last_err = False, 0, "Unknown"
+            while not success and attempt < MAX_RETRIES:
+                attempt += 1
+                try:
+                    await bucket.acquire()
+                    async with session.get(download_url) as resp:
+                        status = resp.status
+                        bucket.update(resp.headers)
+                        if status == 200:
+                            # Multi-snaps arrive as ZIPs: sniff the magic bytes and keep those in memory.
+                            # readexactly() does not depend on where the network splits the first chunk.
+                            try:
+                                head = await resp.content.readexactly(len(ZIP_MAGIC))
+                            except asyncio.IncompleteReadError as e:
+                                head = e.partial  # Body shorter than the magic itself
+                            is_zip = head == ZIP_MAGIC
+                            chunks = resp.content.iter_chunked(CHUNK_SIZE)
+                            if is_zip:
+                                buffer = io.BytesIO()
+                                buffer.write(head)
+                                async for chunk in chunks: buffer.write(chunk)
                             else:
-                                set_metadata_from_filename(filepath)
-                                if ext == ".mp4": stats["mp4"] += 1
-                                else: stats["jpg"] += 1
-                                success = True
-                            
-                            if success:
-                                print("   ✅ Done")
-                                time.sleep(5) 
+                                # A truncated file would be skipped as done on the next run: write to
+                                # .part and only move it into place once the body is complete
+                                part_path = f"{filepath}.part"
+                                try:
+                                    async with aiofiles.open(part_path, 'wb', buffering=CHUNK_SIZE) as f:
+                                        await f.write(head)
+                                        async for chunk in chunks: await f.write(chunk)
+                                    os.replace(part_path, filepath)
+                                except BaseException:
+                                    try:
+                                        os.remove(part_path)
+                                    except OSError:
+                                        pass
+                                    raise
                         else:
-                            last_err = f"HTTP {resp.status_code}"
-                            time.sleep(30) if resp.status_code == 503 else time.sleep(2)
-                            retries -= 1
-                    except Exception as e:
-                        last_err = str(e); time.sleep(5); retries -= 1
-                
-                if not success:
-                    stats["errors"] += 1
-                    log_failure(filename, download_url, last_err)
-
-    duration = str(timedelta(seconds=int(time.time() - start_time)))
+                            delay = retry_delay(resp.headers, attempt)
+                            # Throttled: hold back every download from this host, not just this one
+                            if status in (429, 503): bucket.pause(delay)
+
+                    if status != 200:
+                        last_err = f"HTTP {status}"
+                        if attempt < MAX_RETRIES: await asyncio.sleep(delay)
+                        continue
+
+                    # ExifTool and ZIP extraction block, so keep them off the event loop
+                    if is_zip:
+                        # Inflating is CPU-bound: extract in a worker process, sync metadata here
+                        loop = asyncio.get_running_loop()
+                        if await loop.run_in_executor(extract_pool, extract_zip, buffer.getvalue(), extracted_folder):
+                            await asyncio.to_thread(set_metadata_from_filename, extracted_folder, exiftool, True)
+                            print(f"   📦 Extracted and synced ZIP.")
+                            stats["zip"] += 1
+                            existing.add(date_clean)
+                            success = True
+                    else:
+                        await asyncio.to_thread(set_metadata_from_filename, filepath, exiftool)
+                        if ext == ".mp4": stats["mp4"] += 1
+                        else: stats["jpg"] += 1
+                        success = True
+
+                    if success:
+                        print(f"   ✅ Done: {filename}")
+                    else:
+                        last_err = "ZIP extraction failed"
+                except aiohttp.ClientConnectionError as e:
+                    last_err = str(e) or type(e).__name__
+                    if attempt < MAX_RETRIES: await asyncio.sleep(2 ** attempt)
+                except Exception as e:
+                    last_err = str(e)
+                    if attempt < MAX_RETRIES: await asyncio.sleep(retry_delay({}, attempt))
+
+            if not success:
+                stats["errors"] += 1
+                log_failure(filename, download_url, last_err)
+
+    # Idle connections outlive retry back-offs, so TCP/TLS handshakes are paid once per connection
+    connector = aiohttp.TCPConnector(limit=MAX_CONNECTIONS, limit_per_host=MAX_CONNECTIONS_PER_HOST,
+                                     keepalive_timeout=KEEPALIVE_TIMEOUT, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=30)
+    headers = {"User-Agent": "Mozilla/5.0...", "X-Snap-Route-Tag": "mem-dmd"}
+    exiftool = ExifTool(ET_ABS)
+    try:
+        # Workers start mid-run next to ExifTool and resolver threads: spawn, never fork
+        with ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn")) as extract_pool:
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers) as session:
+                await asyncio.gather(*(download_one(session, *memory) for memory in pending))
+    finally:
+        exiftool.close()
+
+    duration = str(timedelta(seconds=int(time.monotonic() - start_time)))
     summary_text = (f"\n{'='*40}\nFINAL SUMMARY\n{'='*40}\n"
                     f"Processed: {total}\nJPEGs:     {stats['jpg']}\nMP4s:      {stats['mp4']}\n"
-                    f"ZIPs:      {stats['zip']} (extracted & deleted)\nSkipped:   {stats['skipped']}\n"
+                    f"ZIPs:      {stats['zip']} (extracted)\nSkipped:   {stats['skipped']}\n"
                     f"Errors:    {stats['errors']}\nDuration:  {duration}\n{'='*40}")
     print(summary_text)
     with open(SUMMARY_FILE, "w", encoding="utf-8") as f: f.write(summary_text)
 
 if __name__ == "__main__":
-    download_memories()
\ No newline at end of file
+    asyncio.run(download_memories())
\ No newline at end of file